@@ -1,7 +1,24 @@
 import anthropic
-import json
+import asyncio
+import hashlib
+import httpx
 import logging
-from config import ANTHROPIC_API_KEY, ANTHROPIC_MODEL, MAX_TOKENS
+import orjson
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_MODEL,
+    MAX_TOKENS,
+    MAX_CONCURRENT_REQUESTS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL
+)
 
 # Configure logging
 logging.basicConfig(
@@ -12,7 +29,7 @@ logger = logging.getLogger(__name__)
 class ToolsFramework:
     """A generic framework for using Anthropic's Claude API with tools"""
     
-    def __init__(self, tools, tool_handlers, system_prompt=None):
+    def __init__(self, tools, tool_handlers, system_prompt=None, read_only_tools=None, cache_size=RESPONSE_CACHE_SIZE):
         """
         Initialize the tools framework
         
@@ -20,15 +37,42 @@ class ToolsFramework:
             tools (list): List of tool definitions in the format expected by Anthropic API
             tool_handlers (dict): Dictionary mapping tool names to their handler functions
             system_prompt (str, optional): System prompt to use for the model
+            read_only_tools (iterable, optional): Names of tools that do not change any state; only
+                turns that use no other tools are cached
+            cache_size (int, optional): Maximum number of cached responses (0 disables the cache)
         """
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        # One long-lived connection pool per framework, sized above httpx's default 100 connections
+        self._http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            # A plain float: the SDK's own HTTP stack does not accept an httpx.Timeout object
+            timeout=HTTP_TIMEOUT
+        )
+        self.client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, http_client=self._http_client)
         self.model = ANTHROPIC_MODEL
         self.max_tokens = MAX_TOKENS
         self.tools = tools
         self.tool_handlers = tool_handlers
         self.system_prompt = system_prompt
+        # Request arguments that are fixed for the lifetime of the framework
+        self._base_kwargs = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "tools": self.tools
+        }
+        if system_prompt:
+            self._base_kwargs["system"] = system_prompt
+        self.read_only_tools = frozenset(read_only_tools or ())
+        self.cache_size = cache_size
+        # Maps a digest of the conversation to (expiry time, the turns the model appended to it), in LRU order
+        self._response_cache = OrderedDict()
+        # Bounds the number of in-flight API calls to respect rate limits
+        self._request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
-    def process_message(self, user_message, conversation_history=None):
+    async def process_message(self, user_message, conversation_history=None):
         """
         Process a user message and return the model's response with tool handling
         
@@ -39,91 +83,236 @@ class ToolsFramework:
         Returns:
             dict: The model's response and any tool call results
         """
-        print(f"\n{'='*50}\nUser Message: {user_message}\n{'='*50}")
-        
-        # Create the messages list for the API
+        logger.debug("User message: %s", user_message)
+
+        # Create the messages list for the API (a new list, so the caller's history is never mutated)
         if conversation_history is None or len(conversation_history) == 0:
             messages = [{"role": "user", "content": user_message}]
         else:
             messages = conversation_history + [{"role": "user", "content": user_message}]
+
+        # Identical conversations get the answer the model gave last time
+        history_length = len(messages)
+        cache_key = self._cache_key(messages)
+        cached_result = self._get_cached_result(cache_key, messages)
+        if cached_result is not None:
+            return cached_result
+        tools_used = set()
         
         # Get the initial response from the model
-        response = self._create_message(messages)
+        response = await self._create_message(messages)
+        tool_calls, text_block = self._split_content(response.content)
         
-        print(f"\nInitial Response:")
-        print(f"Stop Reason: {response.stop_reason}")
+        logger.debug("Initial response stop reason: %s", response.stop_reason)
         
         # Handle tool calls if needed
-        while response.stop_reason == "tool_use":
-            tool_use = next(block for block in response.content if block.type == "tool_use")
-            tool_name = tool_use.name
-            tool_input = tool_use.input
-
-            print(f"\nTool Used: {tool_name}")
-            print(f"Tool Input:")
-            print(json.dumps(tool_input, indent=2))
-
-            # Process the tool call
-            if tool_name in self.tool_handlers:
-                tool_result = self.tool_handlers[tool_name](tool_input)
-            else:
-                print(f"Unknown tool: {tool_name}")
-                tool_result = {"error": f"Unknown tool: {tool_name}"}
-
-            print(f"\nTool Result:")
-            print(json.dumps(tool_result, indent=2))
-
-            # Add the tool result to the conversation
-            messages = [
-                *messages,
-                {"role": "assistant", "content": response.content},
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": tool_use.id,
-                            "content": json.dumps(tool_result) if isinstance(tool_result, (dict, list)) else str(tool_result),
-                        }
-                    ],
-                },
-            ]
+        while tool_calls:
+            # Process every tool call in the response concurrently
+            tool_results = await self._run_tools(tool_calls)
+            tools_used.update(tool_name for _, tool_name, _ in tool_calls)
+
+            # Add the tool results to the conversation
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": tool_results})
 
             # Get the next response
-            response = self._create_message(messages)
+            response = await self._create_message(messages)
+            tool_calls, text_block = self._split_content(response.content)
 
-            print(f"\nResponse:")
-            print(f"Stop Reason: {response.stop_reason}")
+            logger.debug("Response stop reason: %s", response.stop_reason)
 
         # Extract the final text response
-        final_response = next(
-            (block.text for block in response.content if hasattr(block, "text")),
-            None,
-        )
+        final_response = text_block.text if text_block is not None else None
 
-        print(f"\nFinal Response: {final_response}")
+        logger.debug("Final response: %s", final_response)
 
-        return {
+        messages.append({"role": "assistant", "content": response.content})
+        result = {
             "final_response": final_response,
             "full_response": response,
-            "conversation": messages + [{"role": "assistant", "content": response.content}]
+            "conversation": messages
         }
+        self._cache_result(cache_key, result, history_length, tools_used)
+        return result
     
-    def _create_message(self, messages):
-        """Create a message using the Anthropic API with the format provided"""
-        logger.info(f"Creating message with model: {self.model}")
+    async def stream_message(self, user_message, conversation_history=None):
+        """
+        Process a user message, streaming the model's text as it is generated
         
-        kwargs = {
-            "model": self.model,
-            "max_tokens": self.max_tokens,
-            "tools": self.tools,
-            "messages": messages
-        }
+        Args:
+            user_message (str): The user's message
+            conversation_history (list, optional): List of previous messages in the conversation
         
-        if self.system_prompt:
-            kwargs["system"] = self.system_prompt
-            
-        return self.client.messages.create(**kwargs)
+        Yields:
+            dict: A {"type": "chunk", "content": ...} event for each piece of text, followed by
+                a single {"type": "result", ...} event carrying the same fields as process_message
+        """
+        if conversation_history is None or len(conversation_history) == 0:
+            messages = [{"role": "user", "content": user_message}]
+        else:
+            messages = conversation_history + [{"role": "user", "content": user_message}]
+
+        history_length = len(messages)
+        cache_key = self._cache_key(messages)
+        cached_result = self._get_cached_result(cache_key, messages)
+        if cached_result is not None:
+            if cached_result["final_response"]:
+                yield {"type": "chunk", "content": cached_result["final_response"]}
+            yield {"type": "result", **cached_result}
+            return
+        tools_used = set()
+
+        while True:
+            # Logged at DEBUG so it does not land in the middle of the streamed reply
+            logger.debug("Streaming message with model: %s", self.model)
+
+            async with self._request_semaphore:
+                async with self.client.messages.stream(messages=messages, **self._base_kwargs) as stream:
+                    async for text in stream.text_stream:
+                        yield {"type": "chunk", "content": text}
+                    response = await stream.get_final_message()
+
+            tool_calls, text_block = self._split_content(response.content)
+            if not tool_calls:
+                break
+
+            # Keep text streamed before the tool call from running into the follow-up response
+            if text_block is not None:
+                yield {"type": "chunk", "content": "\n"}
+
+            # Run the requested tools and continue the conversation with their results
+            tool_results = await self._run_tools(tool_calls)
+            tools_used.update(tool_name for _, tool_name, _ in tool_calls)
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": tool_results})
+
+        messages.append({"role": "assistant", "content": response.content})
+        result = {
+            "final_response": text_block.text if text_block is not None else None,
+            "full_response": response,
+            "conversation": messages
+        }
+        self._cache_result(cache_key, result, history_length, tools_used)
+        yield {"type": "result", **result}
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool"""
+        await self.client.close()
+
+    def _cache_key(self, messages):
+        """Digest a conversation into a response cache key"""
+        if not self.cache_size:
+            return None
+        # SDK content blocks from earlier turns are pydantic models
+        serialized = orjson.dumps(messages, default=lambda block: block.model_dump(), option=orjson.OPT_NON_STR_KEYS)
+        # A fixed-size digest, so cached entries do not keep whole transcripts alive as keys
+        return hashlib.sha256(serialized).digest()
+
+    def _get_cached_result(self, cache_key, messages):
+        """Return the cached result for a conversation, or None on a miss"""
+        cached = self._response_cache.get(cache_key) if cache_key is not None else None
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            # Expired, so read-only lookups (e.g. an order's status) are fetched again
+            del self._response_cache[cache_key]
+            return None
+
+        self._response_cache.move_to_end(cache_key)
+        _, final_response, response, new_messages = cached
+        logger.debug("Response cache hit")
+        return {
+            "final_response": final_response,
+            "full_response": response,
+            "conversation": messages + new_messages
+        }
+
+    def _cache_result(self, cache_key, result, history_length, tools_used):
+        """Cache a result, or drop every cached result if a state-changing tool was used"""
+        if cache_key is None:
+            return
+
+        if not tools_used <= self.read_only_tools:
+            # Cached answers may depend on state this turn changed (e.g. a cancelled order)
+            self._response_cache.clear()
+            return
+
+        self._response_cache[cache_key] = (
+            time.monotonic() + RESPONSE_CACHE_TTL,
+            result["final_response"],
+            result["full_response"],
+            result["conversation"][history_length:]
+        )
+        if len(self._response_cache) > self.cache_size:
+            self._response_cache.popitem(last=False)
+
+    @staticmethod
+    def _split_content(content):
+        """
+        Partition a response's content blocks in a single pass
+
+        Returns:
+            tuple: A list of (id, name, input) tuples, one per tool_use block, and the first text block
+        """
+        tool_calls = []
+        text_block = None
+        for block in content:
+            block_type = block.type
+            if block_type == "tool_use":
+                # Read the model attributes once; they are reused for dispatch, logging and the reply
+                tool_calls.append((block.id, block.name, block.input))
+            elif block_type == "text":
+                if text_block is None:
+                    text_block = block
+        return tool_calls, text_block
+
+    async def _run_tools(self, tool_calls):
+        """Run the handlers for all tool calls concurrently and return their tool_result blocks"""
+        tool_results = await asyncio.gather(
+            *(asyncio.to_thread(self._call_tool, tool_name, tool_input) for _, tool_name, tool_input in tool_calls)
+        )
+        return [
+            self._tool_result_block(tool_use_id, tool_result)
+            for (tool_use_id, _, _), tool_result in zip(tool_calls, tool_results)
+        ]
+
+    def _call_tool(self, tool_name, tool_input):
+        """Run the handler registered for a tool, returning an error result for unknown tools"""
+        if tool_name not in self.tool_handlers:
+            logger.warning("Unknown tool: %s", tool_name)
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tool used: %s", tool_name)
+            logger.debug("Tool input: %s", orjson.dumps(tool_input, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode())
+
+        tool_result = self.tool_handlers[tool_name](tool_input)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tool result: %s", orjson.dumps(tool_result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode())
+
+        return tool_result
+
+    @staticmethod
+    def _tool_result_block(tool_use_id, tool_result):
+        """Build the tool_result content block sent back to the model"""
+        if isinstance(tool_result, (dict, list)):
+            # Handlers are user-supplied, so results with non-string keys (e.g. {1: "a"}) must still encode
+            content = orjson.dumps(tool_result, option=orjson.OPT_NON_STR_KEYS).decode()
+        else:
+            content = str(tool_result)
+        return {
+            "type": "tool_result",
+            "tool_use_id": tool_use_id,
+            "content": content,
+        }
+
+    async def _create_message(self, messages):
+        """Create a message using the Anthropic API with the format provided"""
+        logger.info("Creating message with model: %s", self.model)
+
+        async with self._request_semaphore:
+            return await self.client.messages.create(messages=messages, **self._base_kwargs)
 
 # Example tools and handlers for a customer service application
 CUSTOMER_SERVICE_TOOLS = [
@@ -171,51 +360,82 @@ CUSTOMER_SERVICE_TOOLS = [
     }
 ]
 
+# Simulated customer data
+CUSTOMERS = MappingProxyType({
+    "C1": {"name": "John Doe", "email": "john@example.com", "phone": "123-456-7890"},
+    "C2": {"name": "Jane Smith", "email": "jane@example.com", "phone": "987-654-3210"}
+})
+
+# Simulated order data
+ORDERS = MappingProxyType({
+    "O1": {"id": "O1", "product": "Widget A", "quantity": 2, "price": 19.99, "status": "Shipped"},
+    "O2": {"id": "O2", "product": "Gadget B", "quantity": 1, "price": 49.99, "status": "Processing"}
+})
+
+_CANCELLABLE_ORDERS = frozenset({"O1", "O2"})
+
 def get_customer_info(params):
-    # Simulated customer data
-    customers = {
-        "C1": {"name": "John Doe", "email": "john@example.com", "phone": "123-456-7890"},
-        "C2": {"name": "Jane Smith", "email": "jane@example.com", "phone": "987-654-3210"}
-    }
-    return customers.get(params["customer_id"], "Customer not found")
+    return CUSTOMERS.get(params["customer_id"], "Customer not found")
 
 def get_order_details(params):
-    # Simulated order data
-    orders = {
-        "O1": {"id": "O1", "product": "Widget A", "quantity": 2, "price": 19.99, "status": "Shipped"},
-        "O2": {"id": "O2", "product": "Gadget B", "quantity": 1, "price": 49.99, "status": "Processing"}
-    }
-    return orders.get(params["order_id"], "Order not found")
+    return ORDERS.get(params["order_id"], "Order not found")
 
 def cancel_order(params):
     # Simulated order cancellation
-    if params["order_id"] in ["O1", "O2"]:
+    if params["order_id"] in _CANCELLABLE_ORDERS:
         return {"success": True, "message": f"Order {params['order_id']} has been cancelled."}
     else:
         return {"success": False, "message": f"Order {params['order_id']} not found or cannot be cancelled."}
 
+# Tool handlers and system prompt for the customer service application
+CUSTOMER_SERVICE_HANDLERS = {
+    "get_customer_info": get_customer_info,
+    "get_order_details": get_order_details,
+    "cancel_order": cancel_order
+}
+
+CUSTOMER_SERVICE_SYSTEM_PROMPT = "You are a helpful customer service assistant. Be friendly and concise in your responses."
+
+# Lookups whose answers are safe to serve from the response cache
+CUSTOMER_SERVICE_READ_ONLY_TOOLS = frozenset({"get_customer_info", "get_order_details"})
+
+# Shared customer service framework, so the process holds a single client and connection pool
+_CUSTOMER_SERVICE_FRAMEWORK = None
+
+def get_customer_service_framework():
+    """Return the process-wide customer service framework, creating it on first use"""
+    global _CUSTOMER_SERVICE_FRAMEWORK
+    if _CUSTOMER_SERVICE_FRAMEWORK is None:
+        _CUSTOMER_SERVICE_FRAMEWORK = ToolsFramework(
+            tools=CUSTOMER_SERVICE_TOOLS, 
+            tool_handlers=CUSTOMER_SERVICE_HANDLERS,
+            system_prompt=CUSTOMER_SERVICE_SYSTEM_PROMPT,
+            read_only_tools=CUSTOMER_SERVICE_READ_ONLY_TOOLS
+        )
+    return _CUSTOMER_SERVICE_FRAMEWORK
+
+async def close_customer_service_framework():
+    """Close the shared customer service framework's client, so the next get creates a fresh one"""
+    global _CUSTOMER_SERVICE_FRAMEWORK
+    framework, _CUSTOMER_SERVICE_FRAMEWORK = _CUSTOMER_SERVICE_FRAMEWORK, None
+    if framework is not None:
+        await framework.aclose()
+
 # Example usage for customer service application
-def example_customer_service():
-    # Create tool handlers dictionary
-    customer_service_handlers = {
-        "get_customer_info": get_customer_info,
-        "get_order_details": get_order_details,
-        "cancel_order": cancel_order
-    }
-    
-    system_prompt = "You are a helpful customer service assistant. Be friendly and concise in your responses."
-    
-    # Initialize the framework
-    framework = ToolsFramework(
-        tools=CUSTOMER_SERVICE_TOOLS, 
-        tool_handlers=customer_service_handlers,
-        system_prompt=system_prompt
-    )
+async def example_customer_service():
+    framework = get_customer_service_framework()
     
     # Example interactions
-    framework.process_message("Can you tell me the email address for customer C1?")
-    framework.process_message("What is the status of order O2?")
-    framework.process_message("Please cancel order O1 for me.")
+    try:
+        for question in (
+            "Can you tell me the email address for customer C1?",
+            "What is the status of order O2?",
+            "Please cancel order O1 for me.",
+        ):
+            result = await framework.process_message(question)
+            print(f"\nUser: {question}\nAssistant: {result['final_response']}")
+    finally:
+        await close_customer_service_framework()
 
 if __name__ == "__main__":
-    example_customer_service()
\ No newline at end of file
+    asyncio.run(example_customer_service())
\ No newline at end of file
@@ -4,6 +4,36 @@
 ANTHROPIC_MODEL = "claude-3-5-sonnet-20240620"
 MAX_TOKENS = 1024
 
+# Maximum number of concurrent requests to the Anthropic API
+MAX_CONCURRENT_REQUESTS = 8
+
+# HTTP connection pool settings for the Anthropic client
+HTTP_MAX_CONNECTIONS = 500
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 400
+HTTP_TIMEOUT = 120.0
+# Seconds an idle keep-alive connection stays open for reuse
+HTTP_KEEPALIVE_EXPIRY = 30.0
+
+# Maximum number of responses kept by the tools framework's and the book assistant's response caches
+RESPONSE_CACHE_SIZE = 128
+
+# Seconds a cached response stays valid in both response caches, so answers reflect data changes after this long
+RESPONSE_CACHE_TTL = 300.0
+
+# Maximum number of conversations whose message history is cached in memory
+HISTORY_CACHE_SIZE = 512
+
+# Maximum number of earlier messages sent to the model with each turn
+MAX_HISTORY_MESSAGES = 500
+
+# Conversation summarization: once more than SUMMARIZE_AFTER_MESSAGES messages (or roughly SUMMARIZE_AFTER_TOKENS
+# tokens) follow the last summary, everything but the most recent KEEP_RECENT_MESSAGES is folded into it
+SUMMARY_MODEL = "claude-3-haiku-20240307"
+SUMMARY_MAX_TOKENS = 512
+SUMMARIZE_AFTER_MESSAGES = 20
+SUMMARIZE_AFTER_TOKENS = 4000
+KEEP_RECENT_MESSAGES = 6
+
 # Conversation database settings
 DB_DIR = "book-data"
 
@@ -12,4 +42,11 @@ SYSTEM_PROMPT = """
 You are a helpful book library assistant. You can help users browse their book collection, 
 get information about specific books, and provide recommendations.
 Be concise, friendly, and informative in your responses.
-""" 
\ No newline at end of file
+""" 
+
+# System prompt for summarizing earlier conversation turns
+SUMMARY_SYSTEM_PROMPT = """
+You summarize conversations between a user and a book library assistant.
+Keep every book title, author, genre and book ID that was mentioned, and what the user asked for or preferred.
+Reply with the summary only, in a few short sentences.
+"""
@@ -1,19 +1,163 @@
 import sqlite3
 import os
 import uuid
-from config import DB_DIR
-import datetime
+import atexit
+import threading
+from collections import OrderedDict
+from config import DB_DIR, HISTORY_CACHE_SIZE
 
 # Define the database paths
 BOOKS_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), DB_DIR, "books.db"))
 CONVERSATION_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), DB_DIR, "conversations.db"))
 
+# Database files already switched to WAL (the journal mode is persistent, so it is set once per file)
+_wal_databases = set()
+
+def _open(db_path, **connect_kwargs):
+    """Open a SQLite connection with the application's journal and cache settings"""
+    conn = sqlite3.connect(db_path, **connect_kwargs)
+
+    if db_path not in _wal_databases:
+        # WAL lets readers run alongside the writer and needs a single fsync per commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_databases.add(db_path)
+
+    # These settings are per connection
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Wait for a concurrent writer rather than failing with "database is locked"
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+# One connection per thread and database, reused across calls instead of reconnecting for every query
+_thread_local = threading.local()
+_pooled_connections = []
+_pool_lock = threading.Lock()
+
+def _pooled_connection(db_path):
+    """Return the calling thread's connection to a database, opening it on first use"""
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+
+    conn = connections.get(db_path)
+    if conn is None:
+        # The directory check runs once per thread and database rather than on every lookup
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Only the owning thread uses the connection; the check is relaxed so it can be closed at exit
+        # A larger statement cache keeps every hot query compiled for the life of the connection
+        conn = _open(db_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        connections[db_path] = conn
+        with _pool_lock:
+            _pooled_connections.append(conn)
+
+    return conn
+
+def close_connections():
+    """Close all pooled connections, refreshing planner statistics first where SQLite sees a need"""
+    with _pool_lock:
+        for conn in _pooled_connections:
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        _pooled_connections.clear()
+
+atexit.register(close_connections)
+
+# Per-conversation message history, conversation_id -> [last message id, messages], least recently used first
+_history_cache = OrderedDict()
+_history_lock = threading.Lock()
+
+def _cache_history(conversation_id, new_messages):
+    """Append (id, message) pairs newer than the cached entry and return a copy of its messages"""
+    with _history_lock:
+        entry = _history_cache.get(conversation_id)
+        if entry is None:
+            entry = _history_cache[conversation_id] = [0, []]
+        else:
+            _history_cache.move_to_end(conversation_id)
+
+        for message_id, message in new_messages:
+            # Another thread may have appended the same rows since they were read
+            if message_id > entry[0]:
+                entry[0] = message_id
+                entry[1].append(message)
+
+        if len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+
+        return list(entry[1])
+
+# Sample data seeded by init_db
+SAMPLE_GENRES = (
+    (1, "Fiction"),
+    (2, "Non-Fiction"),
+    (3, "Science Fiction"),
+    (4, "Mystery"),
+    (5, "Biography"),
+    (6, "Fantasy"),
+    (7, "Historical Fiction"),
+    (8, "Romance"),
+    (9, "Thriller"),
+    (10, "Self-Help")
+)
+
+SAMPLE_AUTHORS = (
+    (1, "J.K. Rowling", 1965),
+    (2, "George Orwell", 1903),
+    (3, "Jane Austen", 1775),
+    (4, "Stephen King", 1947),
+    (5, "Agatha Christie", 1890),
+    (6, "Frank Herbert", 1920),
+    (7, "J.R.R. Tolkien", 1892),
+    (8, "Harper Lee", 1926),
+    (9, "Fyodor Dostoevsky", 1821),
+    (10, "Gabriel García Márquez", 1927),
+    (11, "Leo Tolstoy", 1828),
+    (12, "Ernest Hemingway", 1899),
+    (13, "Mark Twain", 1835),
+    (14, "C.S. Lewis", 1898),
+    (15, "Charles Dickens", 1812)
+)
+
+# (id, title, author_id, genre_id, year_published, rating, notes); date_added comes from the column default
+SAMPLE_BOOKS = (
+    (1, "Harry Potter and the Philosopher's Stone", 1, 6, 1997, 5, "The first book in the Harry Potter series."),
+    (2, "1984", 2, 3, 1949, 5, "A dystopian social science fiction novel."),
+    (3, "Pride and Prejudice", 3, 8, 1813, 4, "A romantic novel of manners."),
+    (4, "The Shining", 4, 9, 1977, 4, "A horror novel set in an isolated hotel."),
+    (5, "Murder on the Orient Express", 5, 4, 1934, 4, "A detective novel featuring Hercule Poirot."),
+    (6, "Dune", 6, 3, 1965, 5, "A science fiction novel set in the distant future."),
+    (7, "The Hobbit", 7, 6, 1937, 5, "A fantasy novel and children's book."),
+    (8, "To Kill a Mockingbird", 8, 1, 1960, 5, "A novel about racial inequality in the American South."),
+    (9, "Crime and Punishment", 9, 1, 1866, 4, "A novel focused on the mental anguish of a murderer."),
+    (10, "One Hundred Years of Solitude", 10, 1, 1967, 5, "A landmark of magical realism."),
+    (11, "War and Peace", 11, 7, 1869, 5, "A novel about Russian society during the Napoleonic era."),
+    (12, "The Old Man and the Sea", 12, 1, 1952, 4, "A short novel about an aging Cuban fisherman."),
+    (13, "The Adventures of Huckleberry Finn", 13, 1, 1884, 4, "A novel about a boy's journey down the Mississippi River."),
+    (14, "The Chronicles of Narnia: The Lion, the Witch and the Wardrobe", 14, 6, 1950, 5, "A fantasy novel set in the magical land of Narnia."),
+    (15, "Great Expectations", 15, 1, 1861, 4, "A novel about an orphan's rise in society."),
+    (16, "Harry Potter and the Chamber of Secrets", 1, 6, 1998, 4, "The second book in the Harry Potter series."),
+    (17, "Harry Potter and the Prisoner of Azkaban", 1, 6, 1999, 5, "The third book in the Harry Potter series."),
+    (18, "Animal Farm", 2, 1, 1945, 4, "An allegorical novella about the Russian Revolution."),
+    (19, "Emma", 3, 8, 1815, 4, "A novel about youthful hubris and romantic misunderstandings."),
+    (20, "It", 4, 9, 1986, 4, "A horror novel about a shapeshifting entity."),
+    (21, "Death on the Nile", 5, 4, 1937, 4, "A murder mystery set in Egypt."),
+    (22, "Dune Messiah", 6, 3, 1969, 4, "The second novel in the Dune series."),
+    (23, "The Lord of the Rings: The Fellowship of the Ring", 7, 6, 1954, 5, "The first volume of the Lord of the Rings trilogy."),
+    (24, "Go Set a Watchman", 8, 1, 2015, 3, "A novel featuring characters from To Kill a Mockingbird."),
+    (25, "The Brothers Karamazov", 9, 1, 1880, 5, "A philosophical novel about faith, doubt, and reason.")
+)
+
 def init_db():
     """Initialize the books database with the schema and sample data"""
     # Ensure the directory exists
     os.makedirs(os.path.dirname(BOOKS_DB_PATH), exist_ok=True)
 
-    conn = sqlite3.connect(BOOKS_DB_PATH)
+    conn = _open(BOOKS_DB_PATH)
     cursor = conn.cursor()
 
     # Create genres table
@@ -49,92 +193,46 @@ def init_db():
     )
     """)
 
-    # Add sample genres
-    genres = [
-        (1, "Fiction"),
-        (2, "Non-Fiction"),
-        (3, "Science Fiction"),
-        (4, "Mystery"),
-        (5, "Biography"),
-        (6, "Fantasy"),
-        (7, "Historical Fiction"),
-        (8, "Romance"),
-        (9, "Thriller"),
-        (10, "Self-Help")
-    ]
-    
-    cursor.execute("DELETE FROM genres")
-    cursor.executemany("INSERT OR IGNORE INTO genres (id, name) VALUES (?, ?)", genres)
-    
-    # Add sample authors
-    authors = [
-        (1, "J.K. Rowling", 1965),
-        (2, "George Orwell", 1903),
-        (3, "Jane Austen", 1775),
-        (4, "Stephen King", 1947),
-        (5, "Agatha Christie", 1890),
-        (6, "Frank Herbert", 1920),
-        (7, "J.R.R. Tolkien", 1892),
-        (8, "Harper Lee", 1926),
-        (9, "Fyodor Dostoevsky", 1821),
-        (10, "Gabriel García Márquez", 1927),
-        (11, "Leo Tolstoy", 1828),
-        (12, "Ernest Hemingway", 1899),
-        (13, "Mark Twain", 1835),
-        (14, "C.S. Lewis", 1898),
-        (15, "Charles Dickens", 1812)
-    ]
-    
-    cursor.execute("DELETE FROM authors")
-    cursor.executemany("INSERT OR IGNORE INTO authors (id, name, birth_year) VALUES (?, ?, ?)", authors)
-    
-    # Add sample books
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    books = [
-        (1, "Harry Potter and the Philosopher's Stone", 1, 6, 1997, 5, "The first book in the Harry Potter series.", current_date),
-        (2, "1984", 2, 3, 1949, 5, "A dystopian social science fiction novel.", current_date),
-        (3, "Pride and Prejudice", 3, 8, 1813, 4, "A romantic novel of manners.", current_date),
-        (4, "The Shining", 4, 9, 1977, 4, "A horror novel set in an isolated hotel.", current_date),
-        (5, "Murder on the Orient Express", 5, 4, 1934, 4, "A detective novel featuring Hercule Poirot.", current_date),
-        (6, "Dune", 6, 3, 1965, 5, "A science fiction novel set in the distant future.", current_date),
-        (7, "The Hobbit", 7, 6, 1937, 5, "A fantasy novel and children's book.", current_date),
-        (8, "To Kill a Mockingbird", 8, 1, 1960, 5, "A novel about racial inequality in the American South.", current_date),
-        (9, "Crime and Punishment", 9, 1, 1866, 4, "A novel focused on the mental anguish of a murderer.", current_date),
-        (10, "One Hundred Years of Solitude", 10, 1, 1967, 5, "A landmark of magical realism.", current_date),
-        (11, "War and Peace", 11, 7, 1869, 5, "A novel about Russian society during the Napoleonic era.", current_date),
-        (12, "The Old Man and the Sea", 12, 1, 1952, 4, "A short novel about an aging Cuban fisherman.", current_date),
-        (13, "The Adventures of Huckleberry Finn", 13, 1, 1884, 4, "A novel about a boy's journey down the Mississippi River.", current_date),
-        (14, "The Chronicles of Narnia: The Lion, the Witch and the Wardrobe", 14, 6, 1950, 5, "A fantasy novel set in the magical land of Narnia.", current_date),
-        (15, "Great Expectations", 15, 1, 1861, 4, "A novel about an orphan's rise in society.", current_date),
-        (16, "Harry Potter and the Chamber of Secrets", 1, 6, 1998, 4, "The second book in the Harry Potter series.", current_date),
-        (17, "Harry Potter and the Prisoner of Azkaban", 1, 6, 1999, 5, "The third book in the Harry Potter series.", current_date),
-        (18, "Animal Farm", 2, 1, 1945, 4, "An allegorical novella about the Russian Revolution.", current_date),
-        (19, "Emma", 3, 8, 1815, 4, "A novel about youthful hubris and romantic misunderstandings.", current_date),
-        (20, "It", 4, 9, 1986, 4, "A horror novel about a shapeshifting entity.", current_date),
-        (21, "Death on the Nile", 5, 4, 1937, 4, "A murder mystery set in Egypt.", current_date),
-        (22, "Dune Messiah", 6, 3, 1969, 4, "The second novel in the Dune series.", current_date),
-        (23, "The Lord of the Rings: The Fellowship of the Ring", 7, 6, 1954, 5, "The first volume of the Lord of the Rings trilogy.", current_date),
-        (24, "Go Set a Watchman", 8, 1, 2015, 3, "A novel featuring characters from To Kill a Mockingbird.", current_date),
-        (25, "The Brothers Karamazov", 9, 1, 1880, 5, "A philosophical novel about faith, doubt, and reason.", current_date)
-    ]
-    
-    cursor.execute("DELETE FROM books")
-    cursor.executemany("""
-    INSERT INTO books (id, title, author_id, genre_id, year_published, rating, notes, date_added) 
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, books)
+    # Book counts and filters by genre or author read these instead of scanning books; the rowid in every
+    # entry makes them covering for COUNT
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_genre ON books (genre_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_author ON books (author_id)")
 
-    conn.commit()
-    conn.close()
+    # Seed everything in one transaction; INSERT OR REPLACE updates existing rows in place
+    conn.execute("BEGIN")
+    try:
+        cursor.executemany("INSERT OR REPLACE INTO genres (id, name) VALUES (?, ?)", SAMPLE_GENRES)
+        cursor.executemany("INSERT OR REPLACE INTO authors (id, name, birth_year) VALUES (?, ?, ?)", SAMPLE_AUTHORS)
+        cursor.executemany("""
+        INSERT OR REPLACE INTO books (id, title, author_id, genre_id, year_published, rating, notes) 
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, SAMPLE_BOOKS)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
-    print(f"Books database initialized at {BOOKS_DB_PATH} with {len(books)} sample books")
+    print(f"Books database initialized at {BOOKS_DB_PATH} with {len(SAMPLE_BOOKS)} sample books")
+
+# Conversation database files whose schema this process has already set up
+_initialized_conversation_dbs = set()
+_init_lock = threading.Lock()
 
 def init_conversation_db():
-    """Initialize the conversation database"""
+    """Initialize the conversation database (once per process; later calls are no-ops)"""
+    with _init_lock:
+        if CONVERSATION_DB in _initialized_conversation_dbs:
+            return
+        _init_conversation_schema()
+        _initialized_conversation_dbs.add(CONVERSATION_DB)
+
+def _init_conversation_schema():
+    """Create the conversation tables and indexes if they do not exist"""
     os.makedirs(os.path.dirname(CONVERSATION_DB), exist_ok=True)
 
-    conn = sqlite3.connect(CONVERSATION_DB)
+    conn = _open(CONVERSATION_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -169,38 +267,93 @@ def init_conversation_db():
     )
     """)
 
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS conversation_summaries (
+        conversation_id TEXT PRIMARY KEY,
+        summary TEXT,
+        message_count INTEGER,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+    )
+    """)
+
+    # History is read by conversation in message id order; SQLite appends the rowid to every index entry, so
+    # (conversation_id) alone serves both the id range and the ORDER BY without a sort
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages (conversation_id)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_tool_calls_conv ON tool_calls (conversation_id, message_id)
+    """)
+
     conn.commit()
     conn.close()
     
     print(f"Conversation database initialized at {CONVERSATION_DB}")
 
 def get_connection():
-    """Get a database connection to the books database"""
-    os.makedirs(os.path.dirname(BOOKS_DB_PATH), exist_ok=True)
-    return sqlite3.connect(BOOKS_DB_PATH)
+    """Get the calling thread's pooled connection to the books database (do not close it)"""
+    return _pooled_connection(BOOKS_DB_PATH)
 
 def get_conversation_connection():
-    """Get a connection to the conversation database"""
-    os.makedirs(os.path.dirname(CONVERSATION_DB), exist_ok=True)
-    return sqlite3.connect(CONVERSATION_DB)
+    """Get the calling thread's pooled connection to the conversation database (do not close it)"""
+    return _pooled_connection(CONVERSATION_DB)
+
+# Hot conversation queries; each pooled connection compiles them once and reuses the prepared statements
+_SQL_MESSAGES_AFTER = "SELECT id, role, content FROM messages WHERE conversation_id = ? AND id > ? ORDER BY id"
+_SQL_INSERT_CONVERSATION = "INSERT INTO conversations (id) VALUES (?) ON CONFLICT(id) DO NOTHING"
+_SQL_LAST_MESSAGE_ID = "SELECT MAX(id) FROM messages WHERE conversation_id = ?"
+_SQL_INSERT_MESSAGE = "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)"
+_SQL_INSERT_TOOL_CALL = """
+INSERT INTO tool_calls 
+(conversation_id, message_id, tool_name, tool_parameters, tool_response) 
+VALUES (?, ?, ?, ?, ?)
+"""
+_SQL_SELECT_SUMMARY = "SELECT summary, message_count FROM conversation_summaries WHERE conversation_id = ?"
+_SQL_UPSERT_SUMMARY = """
+INSERT INTO conversation_summaries (conversation_id, summary, message_count) VALUES (?, ?, ?)
+ON CONFLICT(conversation_id) DO UPDATE SET
+summary = excluded.summary, message_count = excluded.message_count, updated_at = CURRENT_TIMESTAMP
+"""
 
 def get_messages_by_conversation_id(conversation_id):
-    """Retrieve all messages for a specific conversation"""
+    """Retrieve the messages of a specific conversation, oldest first
+
+    Only rows added since the last call are read from the database; earlier ones come from the history cache.
+    The first call for a conversation reads all of its messages.
+
+    Args:
+        conversation_id (str): The conversation to read
+    """
+    with _history_lock:
+        entry = _history_cache.get(conversation_id)
+        last_id = entry[0] if entry is not None else 0
+
     conn = get_conversation_connection()
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
+    # Plain tuples are cheaper to build and unpack than sqlite3.Row for this hot path
+    cursor.row_factory = None
 
-    cursor.execute(
-        "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY timestamp",
-        (conversation_id,),
-    )
+    # Message ids only grow, so they mark the cached position more precisely than second-resolution timestamps
+    cursor.execute(_SQL_MESSAGES_AFTER, (conversation_id, last_id))
 
-    messages = [
-        {"role": row["role"], "content": row["content"]} for row in cursor.fetchall()
+    # Iterating the cursor fetches rows in batches instead of materializing them all first
+    new_messages = [
+        (message_id, {"role": role, "content": content}) for message_id, role, content in cursor
     ]
 
-    conn.close()
-    return messages
+    return _cache_history(conversation_id, new_messages)
+
+def _extend_cached_history(conversation_id, previous_id, new_messages):
+    """Append just-written (id, message) pairs to a cached history that ends at previous_id"""
+    # Keep an already cached history current without another read
+    with _history_lock:
+        entry = _history_cache.get(conversation_id)
+        if entry is not None and entry[0] == previous_id:
+            for message_id, message in new_messages:
+                entry[0] = message_id
+                entry[1].append(message)
 
 def add_message(conversation_id, role, content):
     """Add a new message to the database"""
@@ -211,17 +364,17 @@ def add_message(conversation_id, role, content):
     cursor = conn.cursor()
 
     try:
-        # Check if conversation exists
-        cursor.execute("SELECT id FROM conversations WHERE id = ?", (conversation_id,))
-        if not cursor.fetchone():
-            cursor.execute(
-                "INSERT INTO conversations (id) VALUES (?)", (conversation_id,)
-            )
+        # Take the write lock up front so the existence check and both inserts are one transaction
+        cursor.execute("BEGIN IMMEDIATE")
 
-        cursor.execute(
-            "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)",
-            (conversation_id, role, content),
-        )
+        # Create the conversation on its first message
+        cursor.execute(_SQL_INSERT_CONVERSATION, (conversation_id,))
+
+        # Latest message before this one, so the history cache is only extended when it has no gap
+        cursor.execute(_SQL_LAST_MESSAGE_ID, (conversation_id,))
+        previous_id = cursor.fetchone()[0] or 0
+
+        cursor.execute(_SQL_INSERT_MESSAGE, (conversation_id, role, content))
 
         message_id = cursor.lastrowid
         conn.commit()
@@ -229,8 +382,8 @@ def add_message(conversation_id, role, content):
         print(f"Database error: {str(e)}")
         conn.rollback()
         raise e
-    finally:
-        conn.close()
+
+    _extend_cached_history(conversation_id, previous_id, [(message_id, {"role": role, "content": content})])
 
     return conversation_id, message_id
 
@@ -241,11 +394,7 @@ def add_tool_call(conversation_id, message_id, tool_name, tool_parameters, tool_
 
     try:
         cursor.execute(
-            """
-            INSERT INTO tool_calls 
-            (conversation_id, message_id, tool_name, tool_parameters, tool_response) 
-            VALUES (?, ?, ?, ?, ?)
-            """,
+            _SQL_INSERT_TOOL_CALL,
             (conversation_id, message_id, tool_name, tool_parameters, tool_response),
         )
 
@@ -255,7 +404,85 @@ def add_tool_call(conversation_id, message_id, tool_name, tool_parameters, tool_
         print(f"Database error when adding tool call: {str(e)}")
         conn.rollback()
         raise e
-    finally:
-        conn.close()
 
-    return tool_call_id 
\ No newline at end of file
+    return tool_call_id 
+
+def add_turn(conversation_id, user_message, assistant_message, tool_calls=()):
+    """
+    Record a complete exchange in a single transaction
+
+    Args:
+        conversation_id (str): The conversation, created if it does not exist yet
+        user_message (str): The user's message
+        assistant_message (str): The assistant's reply
+        tool_calls (iterable, optional): (tool_name, tool_parameters, tool_response) tuples, linked to the user message
+
+    Returns:
+        tuple: The conversation id and the user message id
+    """
+    conn = get_conversation_connection()
+    cursor = conn.cursor()
+
+    try:
+        # One write lock and one commit for the whole turn instead of one per row
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(_SQL_INSERT_CONVERSATION, (conversation_id,))
+
+        cursor.execute(_SQL_LAST_MESSAGE_ID, (conversation_id,))
+        previous_id = cursor.fetchone()[0] or 0
+
+        cursor.execute(_SQL_INSERT_MESSAGE, (conversation_id, "user", user_message))
+        user_message_id = cursor.lastrowid
+
+        cursor.executemany(
+            _SQL_INSERT_TOOL_CALL,
+            [(conversation_id, user_message_id, *tool_call) for tool_call in tool_calls],
+        )
+
+        cursor.execute(_SQL_INSERT_MESSAGE, (conversation_id, "assistant", assistant_message))
+        assistant_message_id = cursor.lastrowid
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error when adding turn: {str(e)}")
+        conn.rollback()
+        raise e
+
+    _extend_cached_history(conversation_id, previous_id, [
+        (user_message_id, {"role": "user", "content": user_message}),
+        (assistant_message_id, {"role": "assistant", "content": assistant_message}),
+    ])
+
+    return conversation_id, user_message_id
+
+def get_conversation_summary(conversation_id):
+    """
+    Retrieve the stored summary of a conversation's earlier messages
+
+    Returns:
+        tuple: The summary and the number of leading messages it covers, or None if there is none
+    """
+    conn = get_conversation_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(_SQL_SELECT_SUMMARY, (conversation_id,))
+    return cursor.fetchone()
+
+def save_conversation_summary(conversation_id, summary, message_count):
+    """
+    Store the summary of a conversation's first message_count messages, replacing any earlier one
+
+    Args:
+        conversation_id (str): The conversation that was summarized
+        summary (str): The summary text
+        message_count (int): How many leading messages of the conversation the summary covers
+    """
+    conn = get_conversation_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_SQL_UPSERT_SUMMARY, (conversation_id, summary, message_count))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error when saving summary: {str(e)}")
+        conn.rollback()
+        raise e
@@ -4,6 +4,14 @@ This file provides examples of how to use both the book library and customer ser
 """
 import logging
 import argparse
+import asyncio
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (and unavailable on Windows)
+    uvloop = None
 
 # Set up logging
 logging.basicConfig(
@@ -13,15 +21,19 @@ logger = logging.getLogger(__name__)
 
 def run_book_assistant():
     """Run the book library assistant"""
-    from responseService import ResponseService
+    from config import ANTHROPIC_MODEL
     from db import init_db, init_conversation_db
     
     # Initialize databases
     init_db()
     init_conversation_db()
+    logger.info("MODEL BEING USED: %s", ANTHROPIC_MODEL)
     
-    # Create the response service
-    service = ResponseService()
+    # Importing the Anthropic SDK takes around a second, so build the service in the background while the user types
+    loader = ThreadPoolExecutor(max_workers=1)
+    service_future = loader.submit(_create_response_service)
+    loader.shutdown(wait=False)
+    service = None
     
     # Interactive loop
     print("\n=== Book Library Assistant ===")
@@ -34,35 +46,31 @@ def run_book_assistant():
             break
             
         try:
-            # Generate response
-            result = service.generate_full_response(user_input, conversation_id)
-            conversation_id = result["conversation_id"]
+            # The response service is usually ready by the time the first message is sent
+            if service is None:
+                service = service_future.result()
             
-            # Print response
-            print(f"\nAssistant: {result['full_response']}")
+            # Stream the response as it is generated
+            print("\nAssistant: ", end="", flush=True)
+            for event in service.stream_full_response(user_input, conversation_id):
+                if event["type"] == "chunk":
+                    print(event["content"], end="", flush=True)
+                else:
+                    conversation_id = event["conversation_id"]
+            print()
         except Exception as e:
-            logger.error(f"Error: {str(e)}")
+            logger.error("Error: %s", e)
             print(f"Error: {str(e)}")
 
+def _create_response_service():
+    """Import the response service module and build the service"""
+    return importlib.import_module("responseService").ResponseService()
+
 def run_customer_service():
     """Run the customer service assistant"""
-    from Tools import ToolsFramework, CUSTOMER_SERVICE_TOOLS, get_customer_info, get_order_details, cancel_order
-    
-    # Create tool handlers dictionary
-    customer_service_handlers = {
-        "get_customer_info": get_customer_info,
-        "get_order_details": get_order_details,
-        "cancel_order": cancel_order
-    }
+    from Tools import get_customer_service_framework
     
-    system_prompt = "You are a helpful customer service assistant. Be friendly and concise in your responses."
-    
-    # Initialize the framework
-    framework = ToolsFramework(
-        tools=CUSTOMER_SERVICE_TOOLS, 
-        tool_handlers=customer_service_handlers,
-        system_prompt=system_prompt
-    )
+    framework = get_customer_service_framework()
     
     # Interactive loop
     print("\n=== Customer Service Assistant ===")
@@ -70,22 +78,33 @@ def run_customer_service():
     print("Sample customer IDs: C1, C2")
     print("Sample order IDs: O1, O2")
     
+    asyncio.run(_customer_service_loop(framework))
+
+async def _customer_service_loop(framework):
+    """Interactive loop for the customer service assistant, run on a single event loop"""
+    from Tools import close_customer_service_framework
+
     conversation_history = []
-    while True:
-        user_input = input("\nYou: ")
-        if user_input.lower() in ['exit', 'quit']:
-            break
-            
-        try:
-            # Process the message
-            result = framework.process_message(user_input, conversation_history)
-            conversation_history = result["conversation"]
-            
-            # Print response
-            print(f"\nAssistant: {result['final_response']}")
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-            print(f"Error: {str(e)}")
+    try:
+        while True:
+            user_input = input("\nYou: ")
+            if user_input.lower() in ['exit', 'quit']:
+                break
+                
+            try:
+                # Stream the response as it is generated
+                print("\nAssistant: ", end="", flush=True)
+                async for event in framework.stream_message(user_input, conversation_history):
+                    if event["type"] == "chunk":
+                        print(event["content"], end="", flush=True)
+                    else:
+                        conversation_history = event["conversation"]
+                print()
+            except Exception as e:
+                logger.error("Error: %s", e)
+                print(f"Error: {str(e)}")
+    finally:
+        await close_customer_service_framework()
 
 def main():
     """Main entry point"""
@@ -98,6 +117,10 @@ def main():
     )
     
     args = parser.parse_args()
+
+    # Use the faster libuv-based event loop when it is installed
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     
     if args.mode == "books":
         run_book_assistant()
@@ -1,8 +1,17 @@
-import json
+import hashlib
 import logging
+import orjson
+import threading
+import time
 import traceback
-from db import get_messages_by_conversation_id, add_message, add_tool_call, init_conversation_db
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import MappingProxyType
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from db import get_messages_by_conversation_id, add_turn, init_conversation_db
 from services.anthropic_service import AnthropicService
+from services.context_compressor import ContextCompressor
 from tools.book_tools import (
     LIST_BOOKS_TOOL,
     GET_BOOK_DETAILS_TOOL,
@@ -25,14 +34,15 @@ logger = logging.getLogger(__name__)
 
 # List of available tools
 TOOLS = [LIST_BOOKS_TOOL, GET_BOOK_DETAILS_TOOL, LIST_GENRES_TOOL, LIST_AUTHORS_TOOL]
+TOOL_NAMES = tuple(tool["name"] for tool in TOOLS)
 
-# Dictionary mapping tool names to their handler functions
-TOOL_HANDLERS = {
+# Read-only mapping of tool names to their handler functions
+TOOL_HANDLERS = MappingProxyType({
     "list_books": list_books,
     "get_book_details": get_book_details,
     "list_genres": list_genres,
     "list_authors": list_authors
-}
+})
 
 # Dictionary mapping tool names to their response formatters
 RESPONSE_FORMATTERS = {
@@ -42,38 +52,107 @@ RESPONSE_FORMATTERS = {
     "list_authors": format_authors_response
 }
 
+# Worker threads for SQLite writes, so a turn's result is returned without waiting for its commit
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Worker threads that run tool handlers while the rest of the model's response is still streaming
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+def _store_turn(conversation_id, user_message, assistant_message, tool_calls=()):
+    """Write a turn, then load the conversation's history so the next turn finds it already cached"""
+    add_turn(conversation_id, user_message, assistant_message, tool_calls)
+    # Runs in the background while the user types the next message
+    get_messages_by_conversation_id(conversation_id)
+
 class ResponseService:
     def __init__(self):
         """Initialize the response service"""
         self.anthropic_service = AnthropicService()
+        # Replaces older turns with a stored summary so long conversations stay small
+        self.context_compressor = ContextCompressor(self.anthropic_service)
+        # Maps (history digest, normalized user message) to (expiry time, response), in LRU order
+        self._response_cache = OrderedDict()
+        # Turns still being written, by conversation id; done-callbacks remove entries from worker threads
+        self._turn_writes = {}
+        self._turn_writes_lock = threading.Lock()
+        # Sets up the schema unless this process already has (run_book_assistant does it at startup)
         init_conversation_db()
 
-    def generate_full_response(self, user_message, conversation_id=None):
-        """Generate a full response using the Anthropic API with tool support"""
-        conversation_id, user_message_id = add_message(
-            conversation_id, "user", user_message
-        )
-        logger.info(f"New user message in conversation {conversation_id}")
-        logger.info(f"User: {user_message}")
+    def generate_full_response(self, user_message, conversation_id=None, history=None):
+        """Generate a full response using the Anthropic API with tool support
 
-        messages = get_messages_by_conversation_id(conversation_id)
+        A caller that has already loaded the conversation's messages can pass them as history to skip the lookup.
+        """
+        for event in self.stream_full_response(user_message, conversation_id, history):
+            if event["type"] == "result":
+                del event["type"]
+                return event
 
-        # Validate messages
-        if not messages or not isinstance(messages, list) or len(messages) == 0:
-            raise ValueError("No messages found for this conversation")
+    def stream_full_response(self, user_message, conversation_id=None, history=None):
+        """
+        Generate a full response, yielding the model's text as it is generated
 
+        Yields:
+            dict: {"type": "chunk", "content": text} events, then a {"type": "result"} event carrying the
+                conversation_id, full_response and speakable_chunks fields of generate_full_response
+        """
+        # The previous turn in this conversation may still be being written; a failed write was already logged
+        with self._turn_writes_lock:
+            pending_write = self._turn_writes.get(conversation_id)
+        if pending_write is not None:
+            wait([pending_write])
+
+        if history is None:
+            history = self.context_compressor.compact(
+                conversation_id, get_messages_by_conversation_id(conversation_id)
+            ) if conversation_id else []
+        # A fresh list that the tool loop extends in place for the rest of the turn
+        messages = self._with_cache_breakpoint(history)
+        messages.append({"role": "user", "content": user_message})
+        if conversation_id is None:
+            conversation_id = str(uuid.uuid4())
+        logger.debug("User: %s", user_message)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, msg in enumerate(history):
+                logger.debug("Message %d - %s: %.50s", i + 1, msg["role"], msg["content"])
+
+        # A repeated question in the same context gets the answer the model gave last time
+        cache_key = self._cache_key(history, user_message)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None and cached[0] <= time.monotonic():
+            # Expired, so a changed catalog is seen again
+            del self._response_cache[cache_key]
+            cached = None
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            logger.debug("Response cache hit")
+            _, full_response, speakable_chunks = cached
+            yield {"type": "chunk", "content": full_response}
+            self._store_turn_in_background(conversation_id, user_message, full_response)
+            yield {
+                "type": "result",
+                "conversation_id": conversation_id,
+                "full_response": full_response,
+                "speakable_chunks": [dict(chunk) for chunk in speakable_chunks]
+            }
+            return
+
+        # Per-turn details are logged at DEBUG so they do not land in the middle of the streamed reply
         model = self.anthropic_service.model
-        logger.info(f"Starting full response with model: {model}")
-        logger.info(f"Messages count: {len(messages)}")
-        logger.info(f"Tools enabled: {[tool['name'] for tool in TOOLS]}")
+        logger.debug("Starting full response with model: %s", model)
+        logger.debug("Messages count: %d", len(messages))
+        logger.debug("Tools enabled: %s", TOOL_NAMES)
+
+        response, tool_futures = yield from self._stream_message(messages)
 
-        # Pass TOOLS to create_message
-        response = self.anthropic_service.create_message(messages, TOOLS)
+        # (tool_name, tool_parameters, tool_response) for every tool the model calls during the turn
+        tool_calls = []
         
         # Check if tool use is needed
         if response.stop_reason == "tool_use":
-            logger.info("Tool use requested by model")
-            response = self._handle_tool_use(response, user_message, conversation_id, user_message_id)
+            logger.debug("Tool use requested by model")
+            response = yield from self._handle_tool_use(response, tool_futures, messages, tool_calls)
 
         # Process the final response
         full_response = ""
@@ -87,114 +166,163 @@ class ResponseService:
                 history_response += text_content
                 speakable_chunks.append({"text": text_content, "speakable": True})
                 
-        # Add the assistant's response to the conversation history
-        add_message(conversation_id, "assistant", history_response)
+        # Store the whole exchange in one transaction without holding up the result
+        self._store_turn_in_background(conversation_id, user_message, history_response, tool_calls)
+
+        self._response_cache[cache_key] = (
+            time.monotonic() + RESPONSE_CACHE_TTL, full_response, [dict(chunk) for chunk in speakable_chunks]
+        )
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
         
-        return {
+        yield {
+            "type": "result",
             "conversation_id": conversation_id,
             "full_response": full_response,
             "speakable_chunks": speakable_chunks
         }
+
+    def _store_turn_in_background(self, conversation_id, user_message, assistant_message, tool_calls=()):
+        """Submit a turn's write, tracking it until it finishes so the conversation's next turn can wait for it"""
+        future = _DB_EXECUTOR.submit(_store_turn, conversation_id, user_message, assistant_message, tool_calls)
+        with self._turn_writes_lock:
+            self._turn_writes[conversation_id] = future
+        # Outside the lock: the callback runs right here if the write has already finished
+        future.add_done_callback(lambda done: self._turn_write_done(conversation_id, done))
+
+    def _turn_write_done(self, conversation_id, future):
+        """Log a failed turn write and stop tracking the finished write"""
+        error = future.exception()
+        if error is not None:
+            logger.error("Error storing turn for conversation %s: %s", conversation_id, error)
+        # A newer write for the same conversation may already have replaced this one
+        with self._turn_writes_lock:
+            if self._turn_writes.get(conversation_id) is future:
+                del self._turn_writes[conversation_id]
+
+    def _stream_message(self, messages):
+        """
+        Stream one model response, yielding its text as chunk events
+
+        Each known tool starts running as soon as its tool_use block is complete, while the rest of the
+        response is still arriving.
+
+        Returns:
+            tuple: The final message and the started tool calls' futures, keyed by tool_use id
+        """
+        tool_futures = {}
+        with self.anthropic_service.stream_message(messages, TOOLS) as stream:
+            for event in stream:
+                if event.type == "text":
+                    yield {"type": "chunk", "content": event.text}
+                elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                    block = event.content_block
+                    handler = TOOL_HANDLERS.get(block.name)
+                    if handler is not None:
+                        tool_futures[block.id] = _TOOL_EXECUTOR.submit(handler, block.input)
+            return stream.get_final_message(), tool_futures
         
-    def _handle_tool_use(self, response, user_message, conversation_id, user_message_id):
-        """Handle tool use in the response"""
+    @staticmethod
+    def _with_cache_breakpoint(history):
+        """
+        Return the history with prompt cache breakpoints on its last message and on the previous turn's
+
+        The prior turns are identical from one request to the next, so the API can serve them from its
+        prompt cache and only the new user message is processed in full. The previous request wrote its
+        cache entry ending at history[-3]; marking that message too makes the read an exact prefix match.
+        """
+        messages = list(history)
+        for index in (-3, -1):
+            if len(messages) < -index or not messages[index]["content"]:
+                continue
+            message = messages[index]
+            # A new dict, so the shared history cache entry is left untouched
+            messages[index] = {
+                "role": message["role"],
+                "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}]
+            }
+        return messages
+
+    @staticmethod
+    def _cache_key(history, user_message):
+        """Build a response cache key from a digest of the whole history sent to the model and the user's message"""
+        # SDK content blocks in a caller-supplied history are pydantic models
+        history_digest = hashlib.sha256(orjson.dumps(history, default=lambda block: block.model_dump())).digest()
+        # Case and spacing differences do not change the question
+        return history_digest, " ".join(user_message.casefold().split())
+
+    def _handle_tool_use(self, response, tool_futures, messages, tool_calls):
+        """
+        Handle tool use in the response, yielding the text of each follow-up response as it streams
+
+        tool_futures holds the tool calls _stream_message already started for the response. Each exchange is
+        appended to messages in place, so follow-up requests keep the conversation history. Successful tool
+        calls are appended to tool_calls to be stored with the rest of the turn.
+        """
         current_response = response
         
         while current_response.stop_reason == "tool_use":
-            # Get the tool use block
-            tool_use = next((block for block in current_response.content if block.type == "tool_use"), None)
+            # Get every tool use block; their handlers are already running concurrently
+            tool_uses = [block for block in current_response.content if block.type == "tool_use"]
             
-            if not tool_use:
+            if not tool_uses:
                 logger.warning("Tool use indicated but no tool_use block found")
                 break
+
+            # Add the exchange to the conversation, answering every tool use in a single message
+            messages.append({"role": "assistant", "content": current_response.content})
+            messages.append({
+                "role": "user",
+                "content": [self._tool_result(tool_use, tool_futures, tool_calls) for tool_use in tool_uses],
+            })
                 
-            tool_name = tool_use.name
-            tool_input = tool_use.input
-            
-            logger.info(f"Tool requested: {tool_name}")
-            logger.info(f"Tool input: {json.dumps(tool_input)}")
-            
-            # Check if we have a handler for this tool
-            if tool_name in TOOL_HANDLERS:
-                try:
-                    # Call the tool handler
-                    tool_result = TOOL_HANDLERS[tool_name](tool_input)
-                    
-                    # Log and store the tool call
-                    tool_params_json = json.dumps(tool_input)
-                    tool_result_json = json.dumps(tool_result)
-                    
-                    logger.info(f"Tool result: {tool_result_json[:100]}...")
-                    add_tool_call(
-                        conversation_id, 
-                        user_message_id, 
-                        tool_name, 
-                        tool_params_json, 
-                        tool_result_json
-                    )
-                    
-                    # Create messages with tool result
-                    messages = [
-                        {"role": "user", "content": user_message},
-                        {"role": "assistant", "content": current_response.content},
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_use.id,
-                                    "content": tool_result_json,
-                                }
-                            ],
-                        },
-                    ]
-                    
-                    # Get the next response
-                    current_response = self.anthropic_service.create_message(messages, TOOLS)
-                    
-                except Exception as e:
-                    logger.error(f"Error executing tool {tool_name}: {str(e)}")
-                    logger.error(traceback.format_exc())
-                    
-                    # Create an error message for the tool
-                    error_message = f"Error executing tool {tool_name}: {str(e)}"
-                    messages = [
-                        {"role": "user", "content": user_message},
-                        {"role": "assistant", "content": current_response.content},
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_use.id,
-                                    "content": json.dumps({"error": error_message}),
-                                }
-                            ],
-                        },
-                    ]
-                    
-                    # Get the next response
-                    current_response = self.anthropic_service.create_message(messages, TOOLS)
-            else:
-                logger.error(f"Unknown tool requested: {tool_name}")
-                # Create an error message for the tool
-                error_message = f"Unknown tool requested: {tool_name}"
-                messages = [
-                    {"role": "user", "content": user_message},
-                    {"role": "assistant", "content": current_response.content},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": json.dumps({"error": error_message}),
-                            }
-                        ],
-                    },
-                ]
-                
-                # Get the next response
-                current_response = self.anthropic_service.create_message(messages, TOOLS)
+            # Keep text streamed before the tool call from running into the follow-up response
+            if any(block.type == "text" for block in current_response.content):
+                yield {"type": "chunk", "content": "\n"}
+
+            # Get the next response
+            current_response, tool_futures = yield from self._stream_message(messages)
                 
         return current_response
+
+    def _tool_result(self, tool_use, tool_futures, tool_calls):
+        """Wait for a tool call's result and return its tool_result block"""
+        tool_name = tool_use.name
+        # Serialized once, for both the log and the tool call record
+        tool_params_json = orjson.dumps(tool_use.input).decode()
+        
+        logger.debug("Tool requested: %s", tool_name)
+        logger.debug("Tool input: %s", tool_params_json)
+        
+        # Known tools were started while the response was streaming; unknown ones have no future
+        tool_future = tool_futures.get(tool_use.id)
+        if tool_future is not None:
+            try:
+                tool_result = tool_future.result()
+                
+                # Log and store the tool call
+                # String results are sent as-is rather than re-encoded as a JSON string
+                tool_result_json = tool_result if isinstance(tool_result, str) else orjson.dumps(tool_result).decode()
+                
+                logger.debug("Tool result: %.100s...", tool_result_json)
+                tool_calls.append((tool_name, tool_params_json, tool_result_json))
+                tool_result_content = tool_result_json
+                
+            except Exception as e:
+                logger.error("Error executing tool %s: %s", tool_name, e)
+                logger.error(traceback.format_exc())
+                
+                # Create an error message for the tool
+                error_message = f"Error executing tool {tool_name}: {str(e)}"
+                tool_result_content = orjson.dumps({"error": error_message}).decode()
+        else:
+            logger.error("Unknown tool requested: %s", tool_name)
+            # Create an error message for the tool
+            error_message = f"Unknown tool requested: {tool_name}"
+            tool_result_content = orjson.dumps({"error": error_message}).decode()
+
+        return {
+            "type": "tool_result",
+            "tool_use_id": tool_use.id,
+            "content": tool_result_content,
+        }
@@ -1,20 +1,51 @@
+import atexit
 import logging
 import anthropic
-from config import ANTHROPIC_API_KEY, ANTHROPIC_MODEL, MAX_TOKENS, SYSTEM_PROMPT
+import httpx
+from config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_MODEL,
+    MAX_TOKENS,
+    SYSTEM_PROMPT,
+    SUMMARY_MODEL,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_SYSTEM_PROMPT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# The system prompt as one cached block; built once so the prefix is byte-identical on every request
+SYSTEM_BLOCKS = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
 class AnthropicService:
     def __init__(self):
         """Initialize the Anthropic client"""
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        # One keep-alive connection pool for every request, so tool follow-ups skip the TLS handshake
+        self._http_client = anthropic.DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            # A plain float: the SDK's own HTTP stack does not accept an httpx.Timeout object
+            timeout=HTTP_TIMEOUT
+        )
+        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, http_client=self._http_client)
+        atexit.register(self.client.close)
         self.model = ANTHROPIC_MODEL
         self.max_tokens = MAX_TOKENS
-        self.system_prompt = SYSTEM_PROMPT
-        logger.info(f"MODEL BEING USED: {self.model}")
+        self.system_prompt = SYSTEM_BLOCKS
+        # The last tool list seen and its cache-marked copy, so the same schemas are not re-copied per call
+        self._tools_source = None
+        self._cached_tools = None
+        logger.debug("MODEL BEING USED: %s", self.model)
 
     def get_client(self):
         """Return the initialized client"""
@@ -22,12 +53,61 @@ class AnthropicService:
 
     def create_message(self, messages, tools=None):
         """Create a non-streaming message using the format provided"""
-        logger.info(f"Creating message with model: {self.model}")
+        logger.info("Creating message with model: %s", self.model)
         
         return self.client.messages.create(
             model=self.model,
             max_tokens=self.max_tokens,
             system=self.system_prompt,
             messages=messages,
-            tools=tools,
-        ) 
\ No newline at end of file
+            tools=self._with_cache_control(tools),
+        )
+
+    def stream_message(self, messages, tools=None):
+        """Create a streaming message using the format provided (use as a context manager)"""
+        logger.debug("Streaming message with model: %s", self.model)
+
+        return self.client.messages.stream(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=self.system_prompt,
+            messages=messages,
+            tools=self._with_cache_control(tools),
+        )
+
+    def create_summary(self, transcript):
+        """
+        Summarize a conversation transcript with the smaller summary model
+
+        Args:
+            transcript (str): The messages to summarize, one "Role: text" line each
+
+        Returns:
+            str: The summary text
+        """
+        logger.debug("Creating summary with model: %s", SUMMARY_MODEL)
+
+        response = self.client.messages.create(
+            model=SUMMARY_MODEL,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            system=SUMMARY_SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": transcript}],
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    def _with_cache_control(self, tools):
+        """
+        Return the tool list with its last schema marked as a prompt cache breakpoint
+
+        Args:
+            tools (list): Tool definitions, or None
+
+        Returns:
+            list: A copy of the tools with cache_control on the last one, or the input if empty
+        """
+        if not tools:
+            return tools
+        if tools is not self._tools_source:
+            self._cached_tools = [*tools[:-1], {**tools[-1], "cache_control": {"type": "ephemeral"}}]
+            self._tools_source = tools
+        return self._cached_tools
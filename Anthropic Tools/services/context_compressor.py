@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    HISTORY_CACHE_SIZE,
+    MAX_HISTORY_MESSAGES,
+    SUMMARIZE_AFTER_MESSAGES,
+    SUMMARIZE_AFTER_TOKENS,
+    KEEP_RECENT_MESSAGES
+)
+from db import get_conversation_summary, save_conversation_summary
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Worker threads for summary requests, so no turn waits on the summary model
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+class ContextCompressor:
+    def __init__(self, anthropic_service):
+        """Initialize the compressor with the service used to call the summary model"""
+        self.anthropic_service = anthropic_service
+        # (summary, message_count) by conversation id, in LRU order
+        self._summaries = OrderedDict()
+        # Conversations with a summary request in flight
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def compact(self, conversation_id, history):
+        """
+        Return the messages to send in place of a conversation's full history
+
+        The messages covered by the stored summary are replaced by a single summary message and the rest are
+        sent verbatim. Once too much has built up past the summary, a new one is made in the background and
+        used from a later turn on.
+
+        Args:
+            conversation_id (str): The conversation the history belongs to
+            history (list): Every message of the conversation, oldest first
+
+        Returns:
+            list: The summary message, if there is one, followed by the unsummarized messages
+        """
+        summary, message_count = self._get_summary(conversation_id)
+        if message_count > len(history):
+            summary, message_count = None, 0
+
+        recent = history[message_count:]
+        if self._over_budget(recent):
+            self._schedule_summary(conversation_id, history, summary, message_count)
+
+        if summary is not None and len(recent) <= MAX_HISTORY_MESSAGES:
+            # A user turn, answered by the assistant turn the verbatim messages open with
+            return [{"role": "user", "content": f"Summary of our earlier conversation: {summary}"}, *recent]
+
+        recent = recent[-MAX_HISTORY_MESSAGES:]
+        # A window cut mid-exchange would open with an assistant turn, which the API rejects
+        if recent and recent[0]["role"] == "assistant":
+            recent = recent[1:]
+        return recent
+
+    @staticmethod
+    def _over_budget(messages):
+        """Check whether the unsummarized messages exceed the message count or estimated token budget"""
+        if len(messages) > SUMMARIZE_AFTER_MESSAGES:
+            return True
+        # Roughly four characters per token
+        return sum(len(message["content"]) for message in messages) // 4 > SUMMARIZE_AFTER_TOKENS
+
+    def _schedule_summary(self, conversation_id, history, summary, message_count):
+        """Start summarizing everything but the most recent messages, unless a request is already running"""
+        cut = len(history) - KEEP_RECENT_MESSAGES
+        # The verbatim messages must open with an assistant turn to follow the summary's user turn
+        while cut < len(history) and history[cut]["role"] != "assistant":
+            cut += 1
+        if cut <= message_count or cut >= len(history):
+            return
+
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+
+        _SUMMARY_EXECUTOR.submit(self._summarize, conversation_id, summary, history[message_count:cut], cut)
+
+    def _summarize(self, conversation_id, summary, messages, message_count):
+        """Fold messages into the previous summary and store the result as covering message_count messages"""
+        try:
+            lines = [f"Earlier summary: {summary}"] if summary else []
+            lines.extend(f"{message['role'].capitalize()}: {message['content']}" for message in messages)
+
+            new_summary = self.anthropic_service.create_summary("\n".join(lines))
+            save_conversation_summary(conversation_id, new_summary, message_count)
+            self._remember(conversation_id, (new_summary, message_count))
+            logger.debug("Summarized %d messages of conversation %s", message_count, conversation_id)
+        except Exception as e:
+            logger.error("Error summarizing conversation %s: %s", conversation_id, e)
+        finally:
+            with self._lock:
+                self._pending.discard(conversation_id)
+
+    def _get_summary(self, conversation_id):
+        """Return a conversation's (summary, message_count), reading the database on a cache miss"""
+        with self._lock:
+            entry = self._summaries.get(conversation_id)
+            if entry is not None:
+                self._summaries.move_to_end(conversation_id)
+                return entry
+
+        entry = get_conversation_summary(conversation_id) or (None, 0)
+        return self._remember(conversation_id, entry)
+
+    def _remember(self, conversation_id, entry):
+        """Cache a (summary, message_count) entry unless a newer one is already cached, and return the newest"""
+        with self._lock:
+            cached = self._summaries.get(conversation_id)
+            # A database read that raced a new summary must not replace it
+            if cached is not None and cached[1] > entry[1]:
+                return cached
+
+            self._summaries[conversation_id] = entry
+            self._summaries.move_to_end(conversation_id)
+            if len(self._summaries) > HISTORY_CACHE_SIZE:
+                self._summaries.popitem(last=False)
+            return entry
@@ -1,5 +1,4 @@
 import json
-import sqlite3
 from db import get_connection
 
 # Tool definitions
@@ -58,114 +57,91 @@ LIST_AUTHORS_TOOL = {
     }
 }
 
+# Queries are module constants so each pooled connection prepares them once and reuses the cached statements
+_LIST_BOOKS_SELECT = """
+SELECT b.id, b.title, a.name as author, g.name as genre, b.year_published, b.rating
+FROM books b
+JOIN authors a ON b.author_id = a.id
+JOIN genres g ON b.genre_id = g.id
+"""
+
+# One statement per filter combination, keyed by (filter by genre, filter by author)
+_SQL_LIST_BOOKS = {
+    (False, False): _LIST_BOOKS_SELECT + " ORDER BY b.title LIMIT ?",
+    (True, False): _LIST_BOOKS_SELECT + " WHERE b.genre_id = ? ORDER BY b.title LIMIT ?",
+    (False, True): _LIST_BOOKS_SELECT + " WHERE b.author_id = ? ORDER BY b.title LIMIT ?",
+    (True, True): _LIST_BOOKS_SELECT + " WHERE b.genre_id = ? AND b.author_id = ? ORDER BY b.title LIMIT ?",
+}
+
+_SQL_BOOK_DETAILS = """
+SELECT b.id, b.title, a.name as author, a.id as author_id, 
+       g.name as genre, g.id as genre_id, 
+       b.year_published, b.rating, b.notes, b.date_added
+FROM books b
+JOIN authors a ON b.author_id = a.id
+JOIN genres g ON b.genre_id = g.id
+WHERE b.id = ?
+"""
+
+# Each count is an index-only lookup on idx_books_genre / idx_books_author, with no join to group
+_SQL_LIST_GENRES = """
+SELECT g.id, g.name, (SELECT COUNT(*) FROM books b WHERE b.genre_id = g.id) as book_count
+FROM genres g
+ORDER BY g.name
+"""
+
+_SQL_LIST_AUTHORS = """
+SELECT a.id, a.name, a.birth_year, (SELECT COUNT(*) FROM books b WHERE b.author_id = a.id) as book_count
+FROM authors a
+ORDER BY a.name
+"""
+
 def list_books(params):
     """List books in the collection with optional filtering"""
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    genre_id = params.get("genre_id")
+    author_id = params.get("author_id")
 
-    query = """
-    SELECT b.id, b.title, a.name as author, g.name as genre, b.year_published, b.rating
-    FROM books b
-    JOIN authors a ON b.author_id = a.id
-    JOIN genres g ON b.genre_id = g.id
-    """
-
-    conditions = []
     query_params = []
-
-    if params.get("genre_id"):
-        conditions.append("b.genre_id = ?")
-        query_params.append(params["genre_id"])
-
-    if params.get("author_id"):
-        conditions.append("b.author_id = ?")
-        query_params.append(params["author_id"])
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
-    query += " ORDER BY b.title"
-    
-    limit = params.get("limit", 10)
-    query += f" LIMIT {limit}"
-
-    cursor.execute(query, query_params)
+    if genre_id:
+        query_params.append(genre_id)
+    if author_id:
+        query_params.append(author_id)
+    # Bound rather than formatted in, so every limit shares one prepared statement
+    query_params.append(params.get("limit", 10))
+
+    cursor = get_connection().execute(_SQL_LIST_BOOKS[bool(genre_id), bool(author_id)], query_params)
     
     books = [dict(row) for row in cursor.fetchall()]
     
-    conn.close()
     return books
 
 def get_book_details(params):
     """Get detailed information about a specific book"""
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query = """
-    SELECT b.id, b.title, a.name as author, a.id as author_id, 
-           g.name as genre, g.id as genre_id, 
-           b.year_published, b.rating, b.notes, b.date_added
-    FROM books b
-    JOIN authors a ON b.author_id = a.id
-    JOIN genres g ON b.genre_id = g.id
-    WHERE b.id = ?
-    """
-
-    cursor.execute(query, (params["book_id"],))
+    cursor = get_connection().execute(_SQL_BOOK_DETAILS, (params["book_id"],))
     
     book = cursor.fetchone()
     
     if not book:
-        conn.close()
         return {"error": f"Book with ID {params['book_id']} not found"}
     
     book_dict = dict(book)
     
-    conn.close()
     return book_dict
 
 def list_genres(params):
     """List all available genres"""
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query = """
-    SELECT g.id, g.name, COUNT(b.id) as book_count
-    FROM genres g
-    LEFT JOIN books b ON g.id = b.genre_id
-    GROUP BY g.id
-    ORDER BY g.name
-    """
-
-    cursor.execute(query)
+    cursor = get_connection().execute(_SQL_LIST_GENRES)
     
     genres = [dict(row) for row in cursor.fetchall()]
     
-    conn.close()
     return genres
 
 def list_authors(params):
     """List all authors in the collection"""
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query = """
-    SELECT a.id, a.name, a.birth_year, COUNT(b.id) as book_count
-    FROM authors a
-    LEFT JOIN books b ON a.id = b.author_id
-    GROUP BY a.id
-    ORDER BY a.name
-    """
-
-    cursor.execute(query)
+    cursor = get_connection().execute(_SQL_LIST_AUTHORS)
     
     authors = [dict(row) for row in cursor.fetchall()]
     
-    conn.close()
     return authors
 
 def format_books_response(books):
@@ -178,25 +154,20 @@ def format_books_response(books):
         }
         return
 
+    # Built as one chunk, so downstream consumers get the whole list in a single event
+    book_lines = [
+        f"📚 {book['title']} by {book['author']}\n"
+        f"   Genre: {book['genre']}, Published: {book['year_published']}\n"
+        f"   Rating: {'⭐' * book['rating'] if book['rating'] else 'Not rated'}\n"
+        for book in books
+    ]
+
     yield {
         "type": "chunk",
-        "content": f"Found {len(books)} books in your collection:\n\n",
+        "content": f"Found {len(books)} books in your collection:\n\n" + "".join(book_lines),
         "speakable": True
     }
 
-    for book in books:
-        book_info = (
-            f"📚 {book['title']} by {book['author']}\n"
-            f"   Genre: {book['genre']}, Published: {book['year_published']}\n"
-            f"   Rating: {'⭐' * book['rating'] if book['rating'] else 'Not rated'}\n"
-        )
-        
-        yield {
-            "type": "chunk",
-            "content": book_info,
-            "speakable": True
-        }
-
 def format_book_details_response(book):
     """Format the book details response for display"""
     if "error" in book:
@@ -236,21 +207,14 @@ def format_genres_response(genres):
         }
         return
 
+    genre_lines = [f"🏷️ {genre['name']} ({genre['book_count']} books)\n" for genre in genres]
+
     yield {
         "type": "chunk",
-        "content": "Available genres in your collection:\n\n",
+        "content": "Available genres in your collection:\n\n" + "".join(genre_lines),
         "speakable": True
     }
 
-    for genre in genres:
-        genre_info = f"🏷️ {genre['name']} ({genre['book_count']} books)\n"
-        
-        yield {
-            "type": "chunk",
-            "content": genre_info,
-            "speakable": True
-        }
-
 def format_authors_response(authors):
     """Format the authors list response for display"""
     if not authors:
@@ -261,11 +225,7 @@ def format_authors_response(authors):
         }
         return
 
-    yield {
-        "type": "chunk",
-        "content": "Authors in your collection:\n\n",
-        "speakable": True
-    }
+    author_lines = []
 
     for author in authors:
         author_info = f"✍️ {author['name']}"
@@ -273,10 +233,10 @@ def format_authors_response(authors):
         if author['birth_year']:
             author_info += f" (born {author['birth_year']})"
         
-        author_info += f" - {author['book_count']} books\n"
-        
-        yield {
-            "type": "chunk",
-            "content": author_info,
-            "speakable": True
-        } 
\ No newline at end of file
+        author_lines.append(f"{author_info} - {author['book_count']} books\n")
+
+    yield {
+        "type": "chunk",
+        "content": "Authors in your collection:\n\n" + "".join(author_lines),
+        "speakable": True
+    }
\ No newline at end of file